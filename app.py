@@ -2,7 +2,7 @@
 
 from flask import Flask, render_template, request, jsonify, send_file, session
 from werkzeug.utils import secure_filename
-from PIL import Image
+from PIL import Image, ImageDraw
 import os
 import json
 import shutil
@@ -14,12 +14,16 @@ import uuid
 import io
 import base64
 import zipfile
+import itertools
+from concurrent.futures import ThreadPoolExecutor
 import backend_logic
 
-# Determine if running as executable or script
+# Determine if running as executable or script (fixed for the life of the process)
+FROZEN = getattr(sys, 'frozen', False)
+
 def get_base_path():
     """Get base path for data files (works for both exe and script)"""
-    if getattr(sys, 'frozen', False):
+    if FROZEN:
         # Running as compiled executable
         return os.path.dirname(sys.executable)
     else:
@@ -68,32 +72,97 @@ def get_output_folder(create=False):
         os.makedirs(output_folder)
     return output_folder
 
-def inject_svg_overlay(svg_content, scale_bar_data=None, table_num_data=None, page_width=0, page_height=0, margin=0):
+# SVG overlay fragments (filled with str.format)
+_SCALE_BAR_GROUP_OPEN = '<g transform="translate({x}, {y})">'
+# Segments are grouped by fill; the group carries the shared paint attributes
+_SCALE_BAR_FILL_GROUP_OPEN = '<g fill="{fill}" stroke="black" stroke-width="1">'
+_SCALE_BAR_SEGMENT = '<rect x="{x}" y="{y}" width="{w}" height="{h}"/>'
+_SCALE_BAR_LABELS = (
+    '<text x="20" y="{label_y}" font-family="Arial" font-size="{font_size}" fill="black">0</text>'
+    '<text x="{end_x}" y="{label_y}" font-family="Arial" font-size="{font_size}" fill="black" text-anchor="end">{label}</text>'
+    '</g>'
+)
+_TABLE_NUMBER_TEXT = '<text x="{x}" y="{y}" font-family="Arial" font-size="{size}" font-weight="bold" fill="black" text-anchor="{anchor}">{text}</text>'
+
+# Table number placement: position -> (page_width, page_height, padding, font_size) -> (x, y, text-anchor).
+# Integer coordinates throughout: pages are whole pixels, and ints format without a float repr
+_TABLE_NUMBER_POSITIONS = {
+    'top_left':      lambda pw, ph, pad, size: (pad, pad + size, "start"),
+    'top_center':    lambda pw, ph, pad, size: (pw // 2, pad + size, "middle"),
+    'top_right':     lambda pw, ph, pad, size: (pw - pad, pad + size, "end"),
+    'bottom_left':   lambda pw, ph, pad, size: (pad, ph - pad, "start"),
+    'bottom_center': lambda pw, ph, pad, size: (pw // 2, ph - pad, "middle"),
+    'bottom_right':  lambda pw, ph, pad, size: (pw - pad, ph - pad, "end"),
+}
+
+def build_scale_bar_svg(scale_bar_data, page_width, page_height, margin):
+    """
+    Builds the SVG group for the scale bar (Bottom Right inside margins).
+    The result is identical for every page of an export, so build it once and reuse it.
+    """
+    sb_w = scale_bar_data['width']
+    sb_h = scale_bar_data['height']
+    x = page_width - sb_w - margin
+    y = page_height - sb_h - margin
+    
+    # Segments, then the "0" and end labels
+    parts = [_SCALE_BAR_GROUP_OPEN.format(x=x, y=y)]
+    for fill in ("black", "white"):
+        segments = [seg for seg in scale_bar_data['segments'] if seg['fill'] == fill]
+        if not segments: continue
+        parts.append(_SCALE_BAR_FILL_GROUP_OPEN.format(fill=fill))
+        parts.extend(_SCALE_BAR_SEGMENT.format(**seg) for seg in segments)
+        parts.append('</g>')
+    parts.append(_SCALE_BAR_LABELS.format(
+        label_y=sb_h - 5, end_x=sb_w - 20,
+        font_size=scale_bar_data['font_size'], label=scale_bar_data['label']
+    ))
+    return ''.join(parts)
+
+# Raster page post-processing (each works on one page in place, so pages can be processed concurrently)
+def scale_bar_placement(scale_bar_img, page_width, page_height, margin):
+    """
+    Position (bottom right, inside the margins) and paste mask for the scale bar.
+    All pages share one size, so compute this once per export rather than per page.
     """
-    Helper to inject Scale Bar and Table Number into the generated SVG string.
+    box = (page_width - scale_bar_img.width - margin, page_height - scale_bar_img.height - margin)
+    mask = None
+    # A fully opaque alpha band would only add a per-page blend
+    if scale_bar_img.mode == 'RGBA' and scale_bar_img.getextrema()[3] != (255, 255):
+        mask = scale_bar_img
+    return box, mask
+
+def paste_scale_bar(page, scale_bar_img, box, mask):
+    """Paste the scale bar at a position from scale_bar_placement."""
+    page.paste(scale_bar_img, box, mask)
+
+def draw_table_number(page, text, font, margin, position='top_left'):
+    """Draw the table number at the top left (or top right), inside the margins."""
+    draw = ImageDraw.Draw(page)
+    xy = (margin, margin)
+    if position == 'top_right':
+        bbox = draw.textbbox((0,0), text, font=font)
+        xy = (page.width - bbox[2] - margin, margin)
+    draw.text(xy, text, font=font, fill="black")
+
+def draw_margin_border(page, margin):
+    """Outline the printable area."""
+    ImageDraw.Draw(page).rectangle([margin, margin, page.width - margin, page.height - margin], outline="black", width=2)
+
+def build_svg_overlay(scale_bar_data=None, table_num_data=None, page_width=0, page_height=0, margin=0,
+                      scale_bar_svg=None):
+    """
+    Builds the Scale Bar and Table Number markup for one SVG page ('' if there is none).
     This mimics the post-processing done on PIL images.
+    Pass a prebuilt scale_bar_svg (see build_scale_bar_svg) to skip rebuilding it per page.
     """
     additions = []
 
     # 1. Inject Scale Bar (Bottom Right)
-    if scale_bar_data:
-        sb_w = scale_bar_data['width']
-        sb_h = scale_bar_data['height']
-        # Position: Bottom Right inside margins
-        x = page_width - sb_w - margin
-        y = page_height - sb_h - margin
-        
-        # Build SVG group for scale bar
-        g = f'<g transform="translate({x}, {y})">'
-        # Segments
-        for seg in scale_bar_data['segments']:
-            g += f'<rect x="{seg["x"]}" y="{seg["y"]}" width="{seg["w"]}" height="{seg["h"]}" fill="{seg["fill"]}" stroke="black" stroke-width="1"/>'
-        # Text 0
-        g += f'<text x="20" y="{sb_h - 5}" font-family="Arial" font-size="{scale_bar_data["font_size"]}" fill="black">0</text>'
-        # Text End
-        g += f'<text x="{sb_w - 20}" y="{sb_h - 5}" font-family="Arial" font-size="{scale_bar_data["font_size"]}" fill="black" text-anchor="end">{scale_bar_data["label"]}</text>'
-        g += '</g>'
-        additions.append(g)
+    if scale_bar_svg is None and scale_bar_data:
+        scale_bar_svg = build_scale_bar_svg(scale_bar_data, page_width, page_height, margin)
+    if scale_bar_svg:
+        additions.append(scale_bar_svg)
 
     # 2. Inject Table Number
     if table_num_data:
@@ -103,31 +172,35 @@ def inject_svg_overlay(svg_content, scale_bar_data=None, table_num_data=None, pa
         t_prefix = table_num_data['prefix']
         text_str = f"{t_prefix} {t_num}"
         
-        # Determine coordinates based on position
-        tx, ty, anchor = 0, 0, "start"
-        padding = margin
-        
-        if t_pos == 'top_left':
-            tx, ty, anchor = padding, padding + t_size, "start"
-        elif t_pos == 'top_center':
-            tx, ty, anchor = page_width / 2, padding + t_size, "middle"
-        elif t_pos == 'top_right':
-            tx, ty, anchor = page_width - padding, padding + t_size, "end"
-        elif t_pos == 'bottom_left':
-            tx, ty, anchor = padding, page_height - padding, "start"
-        elif t_pos == 'bottom_center':
-            tx, ty, anchor = page_width / 2, page_height - padding, "middle"
-        elif t_pos == 'bottom_right':
-            tx, ty, anchor = page_width - padding, page_height - padding, "end"
+        # Determine coordinates based on position (unknown positions fall back to the origin)
+        position_fn = _TABLE_NUMBER_POSITIONS.get(t_pos)
+        tx, ty, anchor = position_fn(page_width, page_height, margin, t_size) if position_fn else (0, 0, "start")
 
-        additions.append(f'<text x="{tx}" y="{ty}" font-family="Arial" font-size="{t_size}" font-weight="bold" fill="black" text-anchor="{anchor}">{text_str}</text>')
+        additions.append(_TABLE_NUMBER_TEXT.format(x=tx, y=ty, size=t_size, anchor=anchor, text=text_str))
 
-    if not additions:
-        return svg_content
+    return "\n".join(additions)
 
-    # Insert before closing </svg>
-    injection = "\n".join(additions)
-    return svg_content.replace('</svg>', f'{injection}\n</svg>')
+# Shared stand-in for images without a metadata row (no per-lookup empty dict)
+_EMPTY_METADATA_ROW = {}
+
+def build_primary_sort_key(image_data, sort_by, metadata):
+    """
+    Returns the primary sort key used for page breaks. The layouts call it repeatedly per image,
+    so every value is computed once up front and the key is a single dict lookup by name.
+    """
+    if sort_by == 'alphabetical':
+        values = {d['name']: d['name'].lower() for d in image_data}
+    elif sort_by == 'natural_name':
+        values = {d['name']: backend_logic.natural_sort_key(d['name']) for d in image_data}
+    elif sort_by == 'size':
+        values = {d['name']: d.get('size', 0) for d in image_data}
+    else:
+        values = {}
+        rows = metadata or {}
+        for d in image_data:
+            value = rows.get(d['name'], _EMPTY_METADATA_ROW).get(sort_by, '')
+            values[d['name']] = value if value is not None else ''
+    return lambda img_data: values[img_data['name']]
 
 
 @app.route('/')
@@ -267,6 +340,9 @@ def preview():
         object_number_position = data.get('objectNumberPosition', 'bottom_center')
         object_number_font_size = int(data.get('objectNumberFontSize', 18))
         
+        # Resolve page dimensions once, before any image work
+        page_w, page_h = backend_logic.get_page_dimensions_px(page_size)
+        
         # Load images
         image_data = backend_logic.load_images_with_info(session_folder)
         if not image_data:
@@ -291,15 +367,7 @@ def preview():
         # Primary sort key function
         primary_sort_key_func = None
         if page_break_on_primary_change:
-            def get_primary_sort_value(img_data):
-                if sort_by == 'alphabetical': return img_data['name'].lower()
-                elif sort_by == 'natural_name': return backend_logic.natural_sort_key(img_data['name'])
-                elif sort_by == 'size': return img_data.get('size', 0)
-                elif metadata and img_data['name'] in metadata:
-                    value = metadata[img_data['name']].get(sort_by, '')
-                    return value if value is not None else ''
-                return ''
-            primary_sort_key_func = get_primary_sort_value
+            primary_sort_key_func = build_primary_sort_key(image_data, sort_by, metadata)
         
         # Scale images
         image_data = backend_logic.scale_images(image_data, scale_factor)
@@ -323,9 +391,6 @@ def preview():
                 scale_bar_cm, pixels_per_cm, scale_factor
             )
         
-        # Get dimensions
-        page_w, page_h = backend_logic.get_page_dimensions_px(page_size)
-        
         # Generate layout (Backend returns tuple: pil_pages, svg_pages)
         if mode == 'grid':
             pil_pages, _ = backend_logic.place_images_grid(
@@ -339,7 +404,8 @@ def preview():
                 vertical_alignment=vertical_alignment,
                 add_object_number=add_object_number,
                 object_number_position=object_number_position,
-                object_number_font_size=object_number_font_size
+                object_number_font_size=object_number_font_size,
+                want_svg=False
             )
         else:
             pil_pages, _ = backend_logic.place_images_puzzle(
@@ -348,7 +414,8 @@ def preview():
                 primary_sort_key=primary_sort_key_func,
                 add_object_number=add_object_number,
                 object_number_position=object_number_position,
-                object_number_font_size=object_number_font_size
+                object_number_font_size=object_number_font_size,
+                want_svg=False
             )
         
         if not pil_pages:
@@ -358,42 +425,28 @@ def preview():
         num_preview_pages = min(20, len(pil_pages))
         preview_urls = []
         
+        if scale_bar_img:
+            scale_bar_box, scale_bar_mask = scale_bar_placement(scale_bar_img, page_w, page_h, margin_px)
+        
+        table_font = None
+        if add_table_number:
+            table_font = backend_logic.get_font(table_font_size)
+        
         for page_idx in range(num_preview_pages):
             page = pil_pages[page_idx]
             
             # Add scale bar
             if scale_bar_img:
-                bar_x = page_w - scale_bar_img.width - margin_px
-                bar_y = page_h - scale_bar_img.height - margin_px
-                page.paste(scale_bar_img, (bar_x, bar_y), scale_bar_img if scale_bar_img.mode == 'RGBA' else None)
+                paste_scale_bar(page, scale_bar_img, scale_bar_box, scale_bar_mask)
             
-            # Add table number (Currently no backend function for this, simple draw assumed or implement locally if needed, 
-            # but for brevity utilizing image draw directly here as done in previous versions if backend_logic lacks it, 
-            # or assuming add_table_number_to_page exists in backend from previous context if not removed. 
-            # Since it was not in the *last* provided backend refactor, we implement a simple drawer here or skip).
-            # *Restoring table number logic locally since it was removed from backend refactor*
+            # Add table number
             if add_table_number:
-                from PIL import ImageDraw, ImageFont
-                draw = ImageDraw.Draw(page)
-                try: font = backend_logic.get_font(table_font_size)
-                except: font = ImageFont.load_default()
-                text = f"{table_prefix} {table_start_number + page_idx}"
-                
-                # Basic positioning logic
-                pad = margin_px
-                if table_position == 'top_left': xy = (pad, pad)
-                elif table_position == 'top_right': 
-                    bbox = draw.textbbox((0,0), text, font=font)
-                    xy = (page_w - bbox[2] - pad, pad)
-                else: xy = (pad, pad) # Default
-                
-                draw.text(xy, text, font=font, fill="black")
+                draw_table_number(page, f"{table_prefix} {table_start_number + page_idx}", table_font, margin_px,
+                                  table_position)
 
             # Add margin border
             if show_margin_border:
-                from PIL import ImageDraw
-                draw = ImageDraw.Draw(page)
-                draw.rectangle([margin_px, margin_px, page_w - margin_px, page_h - margin_px], outline="black", width=2)
+                draw_margin_border(page, margin_px)
             
             # Resize for preview
             preview_width = 1200
@@ -424,6 +477,8 @@ def preview():
 @app.route('/api/generate', methods=['POST'])
 def generate_layout():
     """Generate final layout"""
+    # Temp folder for streamed SVG pages; removed however the request ends
+    svg_export_dir = None
     try:
         data = request.json
         session_folder = get_session_folder()
@@ -464,6 +519,10 @@ def generate_layout():
         add_object_number = data.get('add_object_number', False)
         object_number_position = data.get('object_number_position', 'bottom_center')
         object_number_font_size = int(data.get('object_number_font_size', 18))
+        svg_linked_images = data.get('svg_linked_images', False)
+
+        # Resolve page dimensions once, before any image work
+        page_w, page_h = backend_logic.get_page_dimensions_px(page_size)
 
         # Load images & Metadata
         image_data = backend_logic.load_images_with_info(session_folder)
@@ -481,15 +540,7 @@ def generate_layout():
         # Sort key logic
         primary_sort_key_func = None
         if page_break_on_primary_change:
-            def get_primary_sort_value(img_data):
-                if sort_by == 'alphabetical': return img_data['name'].lower()
-                elif sort_by == 'natural_name': return backend_logic.natural_sort_key(img_data['name'])
-                elif sort_by == 'size': return img_data.get('size', 0)
-                elif metadata and img_data['name'] in metadata:
-                    value = metadata[img_data['name']].get(sort_by, '')
-                    return value if value is not None else ''
-                return ''
-            primary_sort_key_func = get_primary_sort_value
+            primary_sort_key_func = build_primary_sort_key(image_data, sort_by, metadata)
         
         # Scale
         image_data = backend_logic.scale_images(image_data, scale_factor)
@@ -512,14 +563,55 @@ def generate_layout():
             scale_bar_img, scale_bar_svg_data = backend_logic.create_scale_bar(
                 scale_bar_cm, pixels_per_cm, scale_factor
             )
-        
-        # Page Dims
-        page_w, page_h = backend_logic.get_page_dimensions_px(page_size)
-        
-        # Generate Layout (Get tuple!)
-        pil_pages, svg_pages = ([], [])
+            scale_bar_box, scale_bar_mask = scale_bar_placement(scale_bar_img, page_w, page_h, margin_px)
+        
+        # Generate Layout (Get tuple!). SVG pages are only built for SVG export.
+        want_svg = export_format == 'SVG'
+        svg_asset_dir = None
+        svg_page_paths = []
+        svg_writer_factory = None
+        if want_svg:
+            # SVG pages are streamed to files as they are finished instead of collected as strings
+            svg_export_dir = os.path.join(output_folder, f'svg_export_{uuid.uuid4().hex}')
+            os.makedirs(svg_export_dir)
+            # Linked SVG images: each image is written once to an images/ folder and zipped with the pages
+            if svg_linked_images:
+                svg_asset_dir = os.path.join(svg_export_dir, 'images')
+                os.makedirs(svg_asset_dir)
+
+            # The scale bar group is the same on every page
+            scale_bar_svg = None
+            if add_scale_bar and scale_bar_svg_data:
+                scale_bar_svg = build_scale_bar_svg(scale_bar_svg_data, page_w, page_h, margin_px)
+
+            def stream_svg_page(svg_gen):
+                """Called once per finished page, in order: add its overlays and open its file."""
+                i = len(svg_page_paths)
+                # Prepare semantic overlay data
+                t_num_data = None
+                if add_table_number:
+                    t_num_data = {
+                        'number': table_start_number + i,
+                        'position': table_position,
+                        'size': table_font_size,
+                        'prefix': table_prefix
+                    }
+                overlay = build_svg_overlay(
+                    table_num_data=t_num_data,
+                    page_width=page_w,
+                    page_height=page_h,
+                    margin=margin_px,
+                    scale_bar_svg=scale_bar_svg
+                )
+                if overlay: svg_gen.add_raw(overlay)
+
+                path = os.path.join(svg_export_dir, f'layout_page{i + 1}.svg')
+                svg_page_paths.append(path)
+                return open(path, 'w', encoding='utf-8', buffering=1 << 20)
+            svg_writer_factory = stream_svg_page
+        pil_pages = []
         if mode == 'grid':
-            pil_pages, svg_pages = backend_logic.place_images_grid(
+            pil_pages, _ = backend_logic.place_images_grid(
                 image_data, (page_w, page_h), (grid_rows, grid_cols),
                 margin_px, spacing_px,
                 page_break_on_primary_change=page_break_on_primary_change,
@@ -530,16 +622,24 @@ def generate_layout():
                 vertical_alignment=vertical_alignment,
                 add_object_number=add_object_number,
                 object_number_position=object_number_position,
-                object_number_font_size=object_number_font_size
+                object_number_font_size=object_number_font_size,
+                want_raster=not want_svg,
+                want_svg=want_svg,
+                svg_asset_dir=svg_asset_dir,
+                svg_writer_factory=svg_writer_factory
             )
         else:
-            pil_pages, svg_pages = backend_logic.place_images_puzzle(
+            pil_pages, _ = backend_logic.place_images_puzzle(
                 image_data, (page_w, page_h), margin_px, spacing_px,
                 page_break_on_primary_change=page_break_on_primary_change,
                 primary_sort_key=primary_sort_key_func,
                 add_object_number=add_object_number,
                 object_number_position=object_number_position,
-                object_number_font_size=object_number_font_size
+                object_number_font_size=object_number_font_size,
+                want_raster=not want_svg,
+                want_svg=want_svg,
+                svg_asset_dir=svg_asset_dir,
+                svg_writer_factory=svg_writer_factory
             )
         
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
@@ -549,96 +649,73 @@ def generate_layout():
         # 1. PDF Export (Uses PIL Pages)
         if export_format == 'PDF':
             # Post-process PIL pages (Scale bar + Table nums)
-            if scale_bar_img:
-                for page in pil_pages:
-                    bx = page_w - scale_bar_img.width - margin_px
-                    by = page_h - scale_bar_img.height - margin_px
-                    page.paste(scale_bar_img, (bx, by), scale_bar_img if scale_bar_img.mode == 'RGBA' else None)
-            
+            font = None
             if add_table_number:
-                from PIL import ImageDraw, ImageFont
-                for i, page in enumerate(pil_pages):
-                    draw = ImageDraw.Draw(page)
-                    try: font = backend_logic.get_font(table_font_size)
-                    except: font = ImageFont.load_default()
-                    text = f"{table_prefix} {table_start_number + i}"
+                font = backend_logic.get_font(table_font_size)
+
+            def finish_page(i, page):
+                """All overlays for one page in a single visit, while its pixels are hot in cache."""
+                if scale_bar_img:
+                    paste_scale_bar(page, scale_bar_img, scale_bar_box, scale_bar_mask)
+                if add_table_number:
                     # Simple top-left assumption or reuse preview logic
-                    draw.text((margin_px, margin_px), text, font=font, fill="black")
-            
-            if show_margin_border:
-                from PIL import ImageDraw
-                for page in pil_pages:
-                    draw = ImageDraw.Draw(page)
-                    draw.rectangle([margin_px, margin_px, page_w - margin_px, page_h - margin_px], outline="black", width=2)
+                    draw_table_number(page, f"{table_prefix} {table_start_number + i}", font, margin_px)
+                if show_margin_border:
+                    draw_margin_border(page, margin_px)
+
+            # Pages are independent and PIL drops the GIL in paste/draw, so pages run across a thread pool
+            if scale_bar_img or add_table_number or show_margin_border:
+                with ThreadPoolExecutor(max_workers=os.cpu_count()) as pool:
+                    list(pool.map(finish_page, itertools.count(), pil_pages))
 
             output_filename = f'layout_{timestamp}.pdf'
             output_path = os.path.join(output_folder, output_filename)
-            pil_pages[0].save(output_path, "PDF", resolution=300.0, 
-                              save_all=True, append_images=pil_pages[1:] if len(pil_pages) > 1 else [])
+            # The PDF writer emits many small writes; a 1 MB buffer batches them into few syscalls
+            # Every page stays in memory until save() returns: the layouts return the full page list and
+            # Pillow's PDF writer collects append_images into a list of its own before writing
+            with open(output_path, 'wb', buffering=1 << 20) as pdf_file:
+                pil_pages[0].save(pdf_file, "PDF", resolution=300.0, 
+                                  save_all=True, append_images=pil_pages[1:])
 
         # 2. JPG Export (Uses PIL Pages)
         elif export_format == 'JPG':
             # Post-process (Same as PDF)
             if scale_bar_img:
-                for page in pil_pages:
-                    bx = page_w - scale_bar_img.width - margin_px
-                    by = page_h - scale_bar_img.height - margin_px
-                    page.paste(scale_bar_img, (bx, by), scale_bar_img if scale_bar_img.mode == 'RGBA' else None)
+                with ThreadPoolExecutor(max_workers=os.cpu_count()) as pool:
+                    list(pool.map(lambda page: paste_scale_bar(page, scale_bar_img, scale_bar_box, scale_bar_mask), pil_pages))
             
             # Handle Zip vs Single
             if len(pil_pages) > 1:
                 output_filename = f'layout_{timestamp}.zip'
                 output_path = os.path.join(output_folder, output_filename)
+                # Encode each page in memory and write it straight into the archive (no temp files)
                 with zipfile.ZipFile(output_path, 'w') as zipf:
                     for i, page in enumerate(pil_pages, 1):
-                        fname = f'layout_page{i}.jpg'
-                        fpath = os.path.join(output_folder, fname)
-                        page.save(fpath, 'JPEG', dpi=(300,300), quality=95)
-                        zipf.write(fpath, fname)
-                        os.remove(fpath)
+                        buff = io.BytesIO()
+                        page.save(buff, 'JPEG', dpi=(300,300), quality=95)
+                        zipf.writestr(f'layout_page{i}.jpg', buff.getvalue())
             else:
                 output_filename = f'layout_{timestamp}.jpg'
                 output_path = os.path.join(output_folder, output_filename)
                 pil_pages[0].save(output_path, 'JPEG', dpi=(300,300), quality=95)
 
-        # 3. SVG Export (Uses SVG Strings)
+        # 3. SVG Export (pages were streamed to svg_export_dir during layout)
         elif export_format == 'SVG':
-            final_svgs = []
-            for i, svg_str in enumerate(svg_pages):
-                # Prepare semantic overlay data
-                t_num_data = None
-                if add_table_number:
-                    t_num_data = {
-                        'number': table_start_number + i,
-                        'position': table_position,
-                        'size': table_font_size,
-                        'prefix': table_prefix
-                    }
-                
-                # Inject overlays into the SVG string
-                full_svg = inject_svg_overlay(
-                    svg_str, 
-                    scale_bar_data=scale_bar_svg_data if add_scale_bar else None,
-                    table_num_data=t_num_data,
-                    page_width=page_w,
-                    page_height=page_h,
-                    margin=margin_px
-                )
-                final_svgs.append(full_svg)
-
             # Handle Zip vs Single
-            if len(final_svgs) > 1:
+            if len(svg_page_paths) != 1 or svg_asset_dir:
                 output_filename = f'layout_{timestamp}_svg.zip'
                 output_path = os.path.join(output_folder, output_filename)
                 with zipfile.ZipFile(output_path, 'w') as zipf:
-                    for i, svg_content in enumerate(final_svgs, 1):
-                        fname = f'layout_page{i}.svg'
-                        zipf.writestr(fname, svg_content)
+                    for page_path in svg_page_paths:
+                        zipf.write(page_path, os.path.basename(page_path))
+                    if svg_asset_dir:
+                        # Linked images keep the relative images/ path the pages refer to
+                        for asset in sorted(os.listdir(svg_asset_dir)):
+                            zipf.write(os.path.join(svg_asset_dir, asset), f'images/{asset}')
             else:
                 output_filename = f'layout_{timestamp}.svg'
                 output_path = os.path.join(output_folder, output_filename)
-                with open(output_path, 'w', encoding='utf-8') as f:
-                    f.write(final_svgs[0])
+                os.replace(svg_page_paths[0], output_path)
 
         else:
             return jsonify({'error': f'Unsupported export format: {export_format}'}), 400
@@ -646,7 +723,7 @@ def generate_layout():
         return jsonify({
             'success': True,
             'filename': output_filename,
-            'pages': len(pil_pages),
+            'pages': len(svg_page_paths) if want_svg else len(pil_pages),
             'download_url': f'/api/download/{output_filename}'
         })
         
@@ -654,6 +731,9 @@ def generate_layout():
         import traceback
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
+    finally:
+        if svg_export_dir:
+            shutil.rmtree(svg_export_dir, ignore_errors=True)
 
 @app.route('/api/download/<filename>')
 def download_file(filename):
@@ -692,41 +772,61 @@ def clear_session():
 
 if __name__ == '__main__':
     import webbrowser
-    from threading import Timer
+    import socket
     import logging
     
     PORT = 5005
     
+    def wait_for_server(timeout=5.0):
+        """Blocks until the server accepts connections on PORT (or the timeout passes)."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                with socket.create_connection(('127.0.0.1', PORT), timeout=0.05): return
+            except OSError:
+                time.sleep(0.025)
+    
     # Determine if running as compiled exe
-    if getattr(sys, 'frozen', False):
-        # Running as compiled exe - setup logging
-        log_file = os.path.join(os.path.dirname(sys.executable), 'pypotterylayout.log')
+    if FROZEN:
+        # Running as compiled exe - setup logging (BASE_PATH is the executable's folder)
+        log_file = os.path.join(BASE_PATH, 'pypotterylayout.log')
         logging.basicConfig(
             filename=log_file,
             level=logging.INFO,
             format='%(asctime)s - %(levelname)s - %(message)s'
         )
         logging.info("PyPotteryLayout starting...")
-        logging.info(f"Base path: {os.path.dirname(sys.executable)}")
+        logging.info(f"Base path: {BASE_PATH}")
         
         URL = f'http://127.0.0.1:{PORT}'
         
-        # Open browser after 1.5 seconds
+        # Open browser as soon as the server is listening
         def open_browser():
+            wait_for_server()
             try:
                 webbrowser.open(URL)
                 logging.info(f"Browser opened at {URL}")
             except Exception as e:
                 logging.error(f"Failed to open browser: {e}")
         
-        Timer(1.5, open_browser).start()
+        threading.Thread(target=open_browser, daemon=True).start()
         
         # Run server without debug mode
         print(f"PyPotteryLayout is starting...")
         print(f"Opening browser at {URL}")
         
         try:
-            app.run(host='127.0.0.1', port=PORT, debug=False, use_reloader=False)
+            # The bundled app is used for real work: serve it with waitress when it is available,
+            # otherwise with Flask's built-in server
+            try:
+                from waitress import serve
+            except ImportError:
+                serve = None
+            if serve:
+                logging.info("Serving with waitress")
+                serve(app, host='127.0.0.1', port=PORT, threads=4)
+            else:
+                app.run(host='127.0.0.1', port=PORT, debug=False, use_reloader=False)
         except Exception as e:
             error_msg = f"Error starting server: {e}"
             logging.error(error_msg)
@@ -738,7 +838,11 @@ if __name__ == '__main__':
         
         # Open browser only in the main process (not in reloader child process)
         if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
-            Timer(1.5, lambda: webbrowser.open(URL)).start()
+            def open_browser():
+                wait_for_server()
+                webbrowser.open(URL)
+            
+            threading.Thread(target=open_browser, daemon=True).start()
         
         print(f"PyPotteryLayout is starting...")
         print(f"Opening browser at {URL}")
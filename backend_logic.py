@@ -8,12 +8,16 @@ Includes semantic SVG export where text and images remain separate/editable.
 import os
 import re
 import random
+import bisect
+import itertools
 import io
 import base64
+import functools
+import math
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
 from PIL import Image, ImageDraw, ImageFont
 import rectpack
-import openpyxl
 
 # Default page sizes in pixels (300 DPI approximations)
 PAGE_SIZES_PX = {
@@ -24,76 +28,171 @@ PAGE_SIZES_PX = {
     'LETTER': (2550, 3300),
 }
 
+# Modes PNG stores natively; anything else (CMYK, YCbCr, F, ...) is converted to RGB
+_PNG_MODES = ('1', 'L', 'LA', 'P', 'RGB', 'RGBA')
+
+# XML text escaping in one pass (str.translate) instead of chained replace calls
+_XML_ESCAPE = str.maketrans({'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;'})
+
+# SVG element templates. Page coordinates are whole pixels, so they use %d (C-level int
+# formatting); the tspan line step is a float and keeps %s to print exactly as before.
+_IMAGE_FMT = '<image x="%d" y="%d" width="%d" height="%d" href="%s"/>'
+_RECT_FMT = '<rect x="%d" y="%d" width="%d" height="%d" fill="%s"%s/>'
+_RECTS_FMT = '<rect x="%d" y="%d" width="%d" height="%d"/>'
+_LINE_FMT = '<line x1="%d" y1="%d" x2="%d" y2="%d" stroke="%s" stroke-width="%d"/>'
+_TEXT_OPEN_FMT = '<text x="%d" y="%d" font-family="%s" font-size="%d" fill="%s" text-anchor="%s">'
+_TSPAN_FMT = '<tspan x="%d" dy="%s">'
+
+# Scratch draw for text metrics. textbbox/multiline_textbbox only read the draw's settings,
+# so one instance can serve every call (including the caption threads)
+_MEASURE_DRAW = ImageDraw.Draw(Image.new('RGB', (1, 1)))
+
+# Shared pool for PNG encoding of SVG images (Pillow releases the GIL while encoding)
+_ENCODE_POOL = ThreadPoolExecutor(max_workers=os.cpu_count())
+
 # --- SVG Backend Class ---
 
 class SVGGenerator:
     """Helper class to generate semantic SVG content."""
-    def __init__(self, width, height):
+    def __init__(self, width, height, asset_dir=None, asset_cache=None, compress_level=1):
         self.width = width
         self.height = height
+        # zlib level for image PNGs: 1 is fast and lossless; final archival exports may prefer 6+
+        self.compress_level = compress_level
         self.elements = []
         self.defs = []
+        # Linked images: with an asset_dir, each image is written there once as a PNG and
+        # referenced by relative path (<asset folder>/img_0001.png) instead of embedded as base64.
+        # Share one asset_cache (id(img) -> href) between the pages of an export so repeats hit it.
+        self.asset_dir = asset_dir
+        self.asset_cache = asset_cache if asset_cache is not None else {}
 
-    def img_to_base64(self, img):
-        """Converts PIL Image to base64 string."""
-        buff = io.BytesIO()
-        # Convert to RGB if RGBA to save space/avoid issues, unless transparency needed
+    def save_png(self, img, fp):
+        """Writes PIL Image as PNG to a path or file object."""
+        # Only convert modes PNG cannot store; grayscale/palette images stay compact
         save_img = img
-        if img.mode != 'RGBA' and img.mode != 'RGB':
+        if img.mode not in _PNG_MODES:
             save_img = img.convert('RGB')
         
-        save_img.save(buff, format="PNG")
+        # Photographic content barely compresses further at higher levels
+        save_img.save(fp, format="PNG", compress_level=self.compress_level, optimize=False)
+
+    def img_to_base64(self, img):
+        """Converts PIL Image to base64 string."""
+        buff = io.BytesIO()
+        self.save_png(img, buff)
         return base64.b64encode(buff.getvalue()).decode("utf-8")
 
     def add_image(self, img, x, y, width=None, height=None):
-        """Adds an image element."""
+        """Adds an image element. The PNG is encoded in the background and resolved in get_xml."""
         w = width if width else img.width
         h = height if height else img.height
+        if not self.asset_dir:
+            self.elements.append(_ENCODE_POOL.submit(self._image_element, img, x, y, w, h))
+            return
+        
+        cached = self.asset_cache.get(id(img))
+        if cached:
+            self.elements.append(_IMAGE_FMT % (x, y, w, h, cached[1]))
+            return
+        
+        # First use: write the file in the background (the entry keeps img alive so its id stays unique)
+        filename = f"img_{len(self.asset_cache) + 1:04d}.png"
+        href = f"{os.path.basename(os.path.normpath(self.asset_dir))}/{filename}"
+        self.asset_cache[id(img)] = (img, href)
+        self.elements.append(_ENCODE_POOL.submit(self._linked_image_element, img, os.path.join(self.asset_dir, filename), href, x, y, w, h))
+
+    def _image_element(self, img, x, y, w, h):
         b64_str = self.img_to_base64(img)
-        self.elements.append(
-            f'<image x="{x}" y="{y}" width="{w}" height="{h}" href="data:image/png;base64,{b64_str}"/>'
-        )
+        return _IMAGE_FMT % (x, y, w, h, "data:image/png;base64," + b64_str)
+
+    def _linked_image_element(self, img, path, href, x, y, w, h):
+        self.save_png(img, path)
+        return _IMAGE_FMT % (x, y, w, h, href)
 
     def add_text(self, text, x, y, font_size, font_family="Arial", anchor="start", color="black"):
         """Adds a text element. Handles multi-line text via tspan."""
-        lines = text.split('\n')
+        first_line, *other_lines = text.split('\n')
         line_height = font_size * 1.2
         
-        text_xml = f'<text x="{x}" y="{y}" font-family="{font_family}" font-size="{font_size}" fill="{color}" text-anchor="{anchor}">'
+        parts = [_TEXT_OPEN_FMT % (x, y, font_family, font_size, color, anchor)]
         
         # For the first line, we use the y passed. For subsequent, we use dy.
-        for i, line in enumerate(lines):
+        # If anchor is middle, x must be maintained for tspans
+        safe_line = first_line.translate(_XML_ESCAPE)
+        parts.append(_TSPAN_FMT % (x, 0) + safe_line + '</tspan>')
+        next_tspan = _TSPAN_FMT % (x, line_height)
+        for line in other_lines:
             # XML escape for safety
-            safe_line = line.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
-            dy = 0 if i == 0 else line_height
-            # If anchor is middle, x must be maintained for tspans
-            text_xml += f'<tspan x="{x}" dy="{dy}">{safe_line}</tspan>'
+            safe_line = line.translate(_XML_ESCAPE)
+            parts.append(f'{next_tspan}{safe_line}</tspan>')
         
-        text_xml += '</text>'
-        self.elements.append(text_xml)
+        parts.append('</text>')
+        self.elements.append(''.join(parts))
+
+    @staticmethod
+    def _stroke_attrs(stroke, stroke_width):
+        # stroke="none" is the SVG default, so unstroked shapes carry no stroke attributes at all
+        if stroke == "none": return ''
+        return f' stroke="{stroke}" stroke-width="{stroke_width}"'
 
     def add_rect(self, x, y, width, height, fill="none", stroke="none", stroke_width=0):
         """Adds a rectangle (used for dividers, scale bars, etc)."""
-        self.elements.append(
-            f'<rect x="{x}" y="{y}" width="{width}" height="{height}" fill="{fill}" stroke="{stroke}" stroke-width="{stroke_width}"/>'
-        )
+        self.elements.append(_RECT_FMT % (x, y, width, height, fill, self._stroke_attrs(stroke, stroke_width)))
+
+    def add_rects(self, rects):
+        """Adds several (x, y, width, height) rectangles in a single extend; paint comes from the enclosing group."""
+        self.elements.extend(_RECTS_FMT % rect for rect in rects)
 
     def add_line(self, x1, y1, x2, y2, stroke="black", stroke_width=1):
         """Adds a line element."""
-        self.elements.append(
-            f'<line x1="{x1}" y1="{y1}" x2="{x2}" y2="{y2}" stroke="{stroke}" stroke-width="{stroke_width}"/>'
-        )
+        self.elements.append(_LINE_FMT % (x1, y1, x2, y2, stroke, stroke_width))
+
+    def add_group_start(self, **attrs):
+        """Opens a <g> whose attributes (underscores become hyphens) are inherited by its children."""
+        attr_str = ''.join(f' {name.replace("_", "-")}="{value}"' for name, value in attrs.items())
+        self.elements.append(f'<g{attr_str}>')
+
+    def add_group_end(self):
+        """Closes the innermost group opened with add_group_start."""
+        self.elements.append('</g>')
+
+    def add_raw(self, markup):
+        """Adds prebuilt SVG markup (e.g. page overlays) as-is."""
+        self.elements.append(markup)
+
+    def _header(self):
+        return f'<svg width="{self.width}" height="{self.height}" viewBox="0 0 {self.width} {self.height}" xmlns="http://www.w3.org/2000/svg" version="1.1">'
 
     def get_xml(self):
         """Returns the full SVG XML string."""
-        header = f'<svg width="{self.width}" height="{self.height}" viewBox="0 0 {self.width} {self.height}" xmlns="http://www.w3.org/2000/svg" version="1.1">'
-        body = "\n".join(self.elements)
+        header = self._header()
         footer = '</svg>'
-        return header + "\n" + body + "\n" + footer
+        # One join over header, elements and footer: the page body is never copied a second time
+        return "\n".join([header, *(e.result() if isinstance(e, Future) else e for e in self.elements), footer])
+
+    def write_to(self, stream):
+        """Writes the same XML as get_xml to a text stream, element by element, without building the page string."""
+        stream.write(self._header())
+        for e in self.elements:
+            stream.write("\n")
+            stream.write(e.result() if isinstance(e, Future) else e)
+        stream.write("\n</svg>")
+
+
+def _finish_svg_page(svg_gen, svg_pages, svg_writer_factory):
+    """Collects a finished SVG page as a string, or streams it to the caller's writer when one is given."""
+    if svg_writer_factory is None:
+        svg_pages.append(svg_gen.get_xml())
+        return
+    stream = svg_writer_factory(svg_gen)
+    try: svg_gen.write_to(stream)
+    finally: stream.close()
 
 
 # --- Core Functions ---
 
+@functools.lru_cache(maxsize=32)
 def get_page_dimensions_px(size_name_or_custom, custom_size_str=None):
     if isinstance(size_name_or_custom, tuple) and len(size_name_or_custom) == 2:
         return size_name_or_custom
@@ -113,8 +212,9 @@ def get_page_dimensions_px(size_name_or_custom, custom_size_str=None):
     return size_px
 
 
-def get_font(size):
-    """Try to load common TTF fonts, fallback to default."""
+@functools.lru_cache(maxsize=1)
+def _resolve_font_path():
+    """First usable TTF among the common system fonts (None if there is none). Probed once per process."""
     import platform
     font_paths = []
     if platform.system() == "Darwin":  # macOS
@@ -129,11 +229,31 @@ def get_font(size):
     
     for font_path in all_candidates:
         try:
-            font = ImageFont.truetype(font_path, int(size))
-            if font.getbbox("Test")[3] > 0: return font
+            font = ImageFont.truetype(font_path, 12)
+            if font.getbbox("Test")[3] > 0: return font_path
         except Exception: continue
     
-    return ImageFont.load_default()
+    return None
+
+
+# Parsed FreeType faces by (path, size), and the bitmap fallback; both are read-only once loaded
+_load_font = functools.lru_cache(maxsize=32)(ImageFont.truetype)
+_default_font = functools.lru_cache(maxsize=1)(ImageFont.load_default)
+
+
+def get_font(size):
+    """Try to load common TTF fonts, fallback to default. Never raises, so callers need no fallback of their own."""
+    font_path = _resolve_font_path()
+    if font_path is None: return _default_font()
+    try: return _load_font(font_path, int(size))
+    except (OSError, ValueError): return _default_font()
+
+
+@functools.lru_cache(maxsize=4096)
+def _text_width(text, font):
+    """Width of single-line text (same as ImageDraw.textbbox). Fonts come from the get_font cache, so labels repeat across calls."""
+    bbox = font.getbbox(text)
+    return bbox[2] - bbox[0]
 
 
 def get_metadata_headers(filepath):
@@ -147,9 +267,15 @@ def get_metadata_headers(filepath):
                 header = next(reader, None)
                 return header
         else:
-            # Excel file
-            workbook = openpyxl.load_workbook(filepath)
-            return [cell.value for cell in workbook.active[1]]
+            # Excel file (read-only: stream rows instead of building the whole workbook DOM).
+            # openpyxl is imported here, like csv above: it is slow to import and only metadata uploads need it
+            import openpyxl
+            workbook = openpyxl.load_workbook(filepath, read_only=True, data_only=True, keep_links=False)
+            try:
+                header = next(workbook.active.iter_rows(max_row=1, values_only=True), None)
+                return list(header) if header else None
+            finally:
+                workbook.close()
     except Exception: return None
 
 
@@ -167,17 +293,24 @@ def load_metadata(filepath, status_callback=print):
                 if not header:
                     status_callback("CSV file is empty or has no header.")
                     return None
+                header_tail = tuple(header[1:])
                 for row in reader:
                     if row and row[0]:
-                        metadata[row[0]] = {header[i]: row[i] if i < len(row) else None for i in range(1, len(header))}
+                        # Short rows are padded with None for the missing columns
+                        metadata[row[0]] = dict(zip(header_tail, itertools.chain(row[1:], itertools.repeat(None))))
         else:
-            # Excel file
-            workbook = openpyxl.load_workbook(filepath)
-            sheet = workbook.active
-            header = [cell.value for cell in sheet[1]]
-            for row in sheet.iter_rows(min_row=2, values_only=True):
-                if row and row[0]:
-                    metadata[row[0]] = {header[i]: row[i] for i in range(1, len(row))}
+            # Excel file (read-only: stream rows instead of building the whole workbook DOM)
+            import openpyxl
+            workbook = openpyxl.load_workbook(filepath, read_only=True, data_only=True, keep_links=False)
+            try:
+                sheet = workbook.active
+                header = next(sheet.iter_rows(max_row=1, values_only=True), None) or ()
+                header_tail = tuple(header[1:])
+                for row in sheet.iter_rows(min_row=2, values_only=True):
+                    if row and row[0]:
+                        metadata[row[0]] = dict(zip(header_tail, row[1:]))
+            finally:
+                workbook.close()
         
         status_callback(f"Loaded metadata for {len(metadata)} items.")
         return metadata
@@ -193,23 +326,50 @@ def load_images_with_info(folder_path, status_callback=print):
     if not os.path.isdir(folder_path):
         raise FileNotFoundError(f"'{folder_path}' does not exist.")
     
-    for filename in sorted(os.listdir(folder_path)):
-        if filename.lower().endswith(supported_formats):
-            try:
-                filepath = os.path.join(folder_path, filename)
-                img = Image.open(filepath)
-                # Store simple dict initially. SVG components added later.
-                image_data.append({'img': img.copy(), 'name': filename})
-                img.close()
-            except IOError:
-                status_callback(f"Warning: Could not load {filename}.")
+    # Filter while scanning (DirEntry carries the joined path and a cached file type), then sort only the matches
+    with os.scandir(folder_path) as it:
+        entries = [e for e in it if e.name.lower().endswith(supported_formats) and e.is_file()]
+    entries.sort(key=lambda e: e.name)
+    
+    for entry in entries:
+        try:
+            # Header only: pixels are decoded on first use (_ensure_loaded), so images that are
+            # never laid out (e.g. beyond the preview limit) are never decoded
+            with Image.open(entry.path) as img:
+                pixel_size = img.size
+            # Store simple dict initially. SVG components added later.
+            image_data.append({'img': None, 'path': entry.path, 'pixel_size': pixel_size, 'name': entry.name})
+        except IOError:
+            status_callback(f"Warning: Could not load {entry.name}.")
     
     status_callback(f"Loaded {len(image_data)} images.")
     return image_data
 
 
+def _ensure_loaded(data, draft_scale=None):
+    """
+    Returns the item's PIL image, decoding it from 'path' on first use.
+    With draft_scale < 0.5, JPEGs are decoded already reduced (libjpeg's 1/2, 1/4, 1/8 IDCT),
+    keeping at least 2x the target size as headroom for the final LANCZOS resize.
+    """
+    if data['img'] is None:
+        # Decode in place; leaving the block closes the file but keeps the pixels
+        with Image.open(data['path']) as img:
+            if draft_scale and draft_scale < 0.5:
+                # No-op for formats without draft support
+                img.draft(None, (int(img.width * draft_scale * 2), int(img.height * draft_scale * 2)))
+            img.load()
+        data['img'] = img
+    return data['img']
+
+
+_NAT_RE = re.compile(r'(\d+)')
+
+# The same name is keyed again by the page-break checks of the layouts (primary_sort_key), so memoize.
+# Bounded like _text_width: filenames are unique per image, and a long-running server sees many folders.
+@functools.lru_cache(maxsize=8192)
 def natural_sort_key(s):
-    return [int(text) if text.isdigit() else text.lower() for text in re.split(r'(\d+)', s)]
+    return tuple(int(text) if text.isdigit() else text.lower() for text in _NAT_RE.split(s))
 
 
 def sort_images_hierarchical(image_data, primary_sort, secondary_sort, metadata, status_callback=print):
@@ -218,25 +378,35 @@ def sort_images_hierarchical(image_data, primary_sort, secondary_sort, metadata,
     
     status_callback(f"Sorting: '{primary_sort}' -> '{secondary_sort}'...")
     
-    def get_sort_key(img_data, sort_field):
-        if sort_field == 'random': return (0, random.random(), '')
-        elif sort_field == 'natural_name': return (2, 0, natural_sort_key(img_data['name']))
-        elif sort_field == 'alphabetical': return (2, 0, img_data['name'].lower())
-        else:
+    def make_sort_key(sort_field):
+        # Pick the key function once per field instead of re-dispatching on the field name for every image
+        if sort_field == 'random': return lambda img_data: (0, random.random(), '')
+        elif sort_field == 'natural_name': return lambda img_data: (2, 0, natural_sort_key(img_data['name']))
+        elif sort_field == 'alphabetical': return lambda img_data: (2, 0, img_data['name'].lower())
+        
+        def metadata_sort_key(img_data):
             if metadata and img_data['name'] in metadata:
                 value = metadata[img_data['name']].get(sort_field, '')
                 if value is None: return (2, 0, 'zzz_empty')
                 try: return (1, float(str(value).strip()), '')
                 except ValueError: return (2, 0, str(value).lower())
             return (2, 0, 'zzz_no_metadata')
+        return metadata_sort_key
 
     if primary_sort == 'random' and (not secondary_sort or secondary_sort == 'none'):
         random.shuffle(image_data)
     else:
+        primary_key = make_sort_key(primary_sort)
+        secondary_key = make_sort_key(secondary_sort) if secondary_sort and secondary_sort != 'none' else None
+        
         def composite_sort_key(img_data):
-            p_key = get_sort_key(img_data, primary_sort)
-            s_key = get_sort_key(img_data, secondary_sort) if secondary_sort and secondary_sort != 'none' else (0,0,'')
-            return (p_key, s_key, (2, 0, natural_sort_key(img_data['name'])))
+            # The natural name key is the final tie-breaker; split the filename once and reuse it
+            name_key = (2, 0, natural_sort_key(img_data['name']))
+            p_key = name_key if primary_sort == 'natural_name' else primary_key(img_data)
+            if secondary_sort == 'natural_name': s_key = name_key
+            else: s_key = secondary_key(img_data) if secondary_key else (0,0,'')
+            return (p_key, s_key, name_key)
+        # list.sort(key=) already decorates once: composite_sort_key runs once per image, not per comparison
         image_data.sort(key=composite_sort_key)
     
     return image_data
@@ -249,8 +419,7 @@ def create_scale_bar(target_cm, pixels_per_cm, scale_factor, status_callback=pri
     """
     status_callback(f"Creating scale bar representing {target_cm} cm...")
     
-    try: font = get_font(14)
-    except: font = ImageFont.load_default()
+    font = get_font(14)
     
     bar_width_px = int(max(1, target_cm) * pixels_per_cm * scale_factor)
     bar_height_px = 10
@@ -274,13 +443,18 @@ def create_scale_bar(target_cm, pixels_per_cm, scale_factor, status_callback=pri
         'font_size': 14
     }
 
+    # Draw raster: one white bar with the outline, then only the black segments on top.
+    # Adjacent segments share their edge column, so this matches outlining every segment.
+    draw.rectangle([20, 0, int(num_segments * segment_width) + 20, bar_height_px], fill="white", outline="black")
+    
     for i in range(num_segments):
         color = "black" if i % 2 == 0 else "white"
         x0 = int(i * segment_width) + 20
         x1 = int((i + 1) * segment_width) + 20
         
-        # Draw raster
-        draw.rectangle([x0, 0, x1, bar_height_px], fill=color, outline="black")
+        if color == "black":
+            # Plain fill of the inclusive [x0, x1] x [0, bar_height_px] box: a paste is one memset per row
+            bar_img.paste(color, (x0, 0, x1 + 1, bar_height_px + 1))
         
         # Store vector info
         svg_data['segments'].append({
@@ -291,24 +465,60 @@ def create_scale_bar(target_cm, pixels_per_cm, scale_factor, status_callback=pri
     draw.text((20, bar_height_px + 2), "0", fill="black", font=font)
     
     end_label = f"{target_cm} cm"
-    end_label_bbox = draw.textbbox((0, 0), end_label, font=font)
-    end_label_width = end_label_bbox[2] - end_label_bbox[0]
+    end_label_width = _text_width(end_label, font)
     end_label_x = 20 + bar_width_px - end_label_width
     draw.text((end_label_x, bar_height_px + 2), end_label, fill="black", font=font)
 
     return bar_img, svg_data
 
 
+def _for_each_image(func, image_data, status_callback=print):
+    """
+    Runs func on every item, on a thread pool for larger batches (Pillow releases the GIL
+    for decode/resize/paste/text). Small batches run inline: the pool would cost more than it saves.
+    Pixels are decoded lazily, so this is where a corrupt or truncated file first fails: such items
+    are reported and left out of the returned list.
+    """
+    def run(data):
+        try:
+            func(data)
+            return True
+        except OSError:
+            status_callback(f"Warning: Could not load {data['name']}.")
+            return False
+    
+    if len(image_data) <= 8:
+        ok = [run(data) for data in image_data]
+    else:
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as pool:
+            ok = list(pool.map(run, image_data))
+    return [data for data, loaded in zip(image_data, ok) if loaded]
+
+
 def scale_images(image_data, scale_factor, status_callback=print):
-    if scale_factor == 1.0: return image_data
+    # Nothing to resize, but decode here anyway so unreadable files are dropped before the layout
+    if scale_factor == 1.0: return _for_each_image(_ensure_loaded, image_data, status_callback)
     status_callback(f"Applying scale: {scale_factor}x")
-    for data in image_data:
+    
+    def resize_one(data):
         # If we have semantic SVG components, we need to scale their layout info?
         # For simplicity, we scale the base image. SVG components are generated relative to this.
-        new_width = int(data['img'].width * scale_factor)
-        new_height = int(data['img'].height * scale_factor)
-        data['img'] = data['img'].resize((new_width, new_height), Image.Resampling.LANCZOS)
-    return image_data
+        # Target size comes from the source dimensions: a drafted JPEG decodes smaller than its file
+        src_width, src_height = data['img'].size if data['img'] is not None else data['pixel_size']
+        img = _ensure_loaded(data, draft_scale=scale_factor)
+        new_width = max(1, int(src_width * scale_factor))
+        new_height = max(1, int(src_height * scale_factor))
+        # For mild downscales (above 75% of the source size) LANCZOS is indistinguishable from the
+        # cheaper BILINEAR; upscales keep LANCZOS, where BILINEAR is visibly softer
+        if 0.75 < scale_factor < 1.0:
+            data['img'] = img.resize((new_width, new_height), Image.Resampling.BILINEAR)
+        else:
+            # Same shortcut thumbnail() takes: box-reduce by an integer factor first, then LANCZOS over
+            # the last <= 3x. At a gap of 3 the result is practically identical to a full LANCZOS pass
+            data['img'] = img.resize((new_width, new_height), Image.Resampling.LANCZOS, reducing_gap=3.0)
+    
+    # Each resize touches only its own dict
+    return _for_each_image(resize_one, image_data, status_callback)
 
 
 def add_captions_to_images(image_data, metadata, font_size, caption_padding, remove_extension=False, selected_fields=None, hide_field_names=False, status_callback=print):
@@ -318,9 +528,11 @@ def add_captions_to_images(image_data, metadata, font_size, caption_padding, rem
     """
     status_callback("Adding captions to images...")
     font = get_font(font_size)
+    # Catalogs often repeat the same caption (shared typology/site labels): measure each text once
+    caption_sizes = {}
     
-    for data in image_data:
-        original_img = data['img']
+    def caption_image(data):
+        original_img = _ensure_loaded(data)
         
         # 1. Prepare Text
         filename = data['name']
@@ -338,27 +550,31 @@ def add_captions_to_images(image_data, metadata, font_size, caption_padding, rem
         full_caption_text = "\n".join(caption_lines)
         
         # 2. Calculate Dimensions
-        temp_draw = ImageDraw.Draw(Image.new('RGB', (1, 1)))
-        text_bbox = temp_draw.multiline_textbbox((0, 0), full_caption_text, font=font)
-        text_width = text_bbox[2] - text_bbox[0]
-        text_height = text_bbox[3] - text_bbox[1]
+        caption_size = caption_sizes.get(full_caption_text)
+        if caption_size is None:
+            # Filename-only captions are one line: the font measures those without the multiline layout pass
+            if len(caption_lines) == 1: text_bbox = font.getbbox(full_caption_text)
+            else: text_bbox = _MEASURE_DRAW.multiline_textbbox((0, 0), full_caption_text, font=font)
+            caption_size = caption_sizes[full_caption_text] = (text_bbox[2] - text_bbox[0], text_bbox[3] - text_bbox[1])
+        text_width, text_height = caption_size
         
         new_height = original_img.height + text_height + caption_padding * 2
         new_width = max(original_img.width, text_width + caption_padding * 2)
         
-        # 3. Create Raster Image (Preview/JPG output)
-        captioned_img = Image.new('RGB', (new_width, new_height), 'white')
+        # 3. Create Raster Caption (Preview/JPG output)
+        # Only the text strip below the image is rendered; the layouts paste the image and the
+        # strip separately (_paste_item), so the image pixels are never copied into a bigger canvas
+        caption_strip = Image.new('RGB', (new_width, new_height - original_img.height), 'white')
         img_paste_x = (new_width - original_img.width) // 2
-        captioned_img.paste(original_img, (img_paste_x, 0))
         
-        draw = ImageDraw.Draw(captioned_img)
+        draw = ImageDraw.Draw(caption_strip)
         text_x = (new_width - text_width) // 2
         text_y = original_img.height + caption_padding
-        draw.multiline_text((text_x, text_y), full_caption_text, font=font, fill="black", align="center")
+        draw.multiline_text((text_x, caption_padding), full_caption_text, font=font, fill="black", align="center")
         
         # 4. Update Data Structure
-        # 'img' is now the baked version for layout engine and raster export
-        data['img'] = captioned_img
+        # 'img' stays the clean image; together with 'caption_strip' it forms the layout block
+        data['caption_strip'] = caption_strip
         
         # 'svg_components' stores separated semantic data for SVG export
         data['svg_components'] = {
@@ -374,8 +590,43 @@ def add_captions_to_images(image_data, metadata, font_size, caption_padding, rem
                 'text_y': text_y
             }
         }
-        
-    return image_data
+    
+    # Each caption is an independent Pillow pipeline (decode, paste, text draw release the GIL);
+    # every call writes only its own dict, and the size memo tolerates concurrent get/set
+    return _for_each_image(caption_image, image_data, status_callback)
+
+
+def _item_size(data):
+    """Size of an item's layout block: the image, plus its caption strip below it if captioned."""
+    img = _ensure_loaded(data)
+    strip = data.get('caption_strip')
+    if strip is None: return img.size
+    return strip.width, img.height + strip.height
+
+
+def _paste_item(page, data, x, y, mask=None):
+    """Pastes an item's block with its top-left corner at (x, y) (the page is white, like the block)."""
+    img = data['img']
+    strip = data.get('caption_strip')
+    if strip is None:
+        page.paste(img, (x, y), mask)
+        return
+    # Captioned blocks were always opaque RGB, so the image goes in without a mask
+    page.paste(img, (x + (strip.width - img.width) // 2, y))
+    page.paste(strip, (x, y + img.height))
+
+
+def _set_paste_masks(image_data):
+    """
+    Stores each image's paste mask (the image itself for RGBA, else None) as 'paste_mask'.
+    Called by the layouts once their images are final, so the paste loops skip the mode check.
+    """
+    for data in image_data:
+        img = data['img']
+        # Fully opaque RGBA (common for silhouettes) pastes identically as a plain copy, without
+        # the per-pixel blend: one extrema scan here instead of a composite on every paste
+        needs_alpha = img.mode == 'RGBA' and img.getextrema()[3][0] < 255
+        data['paste_mask'] = img if needs_alpha else None
 
 
 def _render_item_to_svg(svg_gen, item_data, abs_x, abs_y):
@@ -408,17 +659,14 @@ def _render_item_to_svg(svg_gen, item_data, abs_x, abs_y):
     elif 'svg_components' in item_data and item_data['svg_components']['type'] == 'scale_bar':
         svg_data = item_data['svg_components']
         
-        # Draw segments
-        for seg in svg_data['segments']:
-            svg_gen.add_rect(
-                x = abs_x + seg['x'],
-                y = abs_y + seg['y'],
-                width = seg['w'],
-                height = seg['h'],
-                fill = seg['fill'],
-                stroke = "black",
-                stroke_width = 1
-            )
+        # Draw segments: one group per fill colour carries the shared paint attributes,
+        # so each rect only has its geometry (segments never overlap, so order is free)
+        for fill in ("black", "white"):
+            segments = [seg for seg in svg_data['segments'] if seg['fill'] == fill]
+            if not segments: continue
+            svg_gen.add_group_start(fill=fill, stroke="black", stroke_width=1)
+            svg_gen.add_rects((abs_x + seg['x'], abs_y + seg['y'], seg['w'], seg['h']) for seg in segments)
+            svg_gen.add_group_end()
         
         # Draw text labels (0 and Total)
         # Label 0
@@ -442,16 +690,21 @@ def place_images_grid(image_data, page_size_px, grid_size, margin_px, spacing_px
                       page_break_on_primary_change=False, primary_sort_key=None, 
                       primary_break_type='new_page', divider_thickness=5, divider_width_percent=80,
                       vertical_alignment='center', add_object_number=False, object_number_position='bottom_center', 
-                      object_number_font_size=18, status_callback=print):
+                      object_number_font_size=18, want_raster=True, want_svg=True, svg_asset_dir=None,
+                      svg_writer_factory=None, status_callback=print):
     
     rows_per_page, suggested_cols = grid_size
     page_width, page_height = page_size_px
     available_width = page_width - (2 * margin_px)
     available_height = page_height - (2 * margin_px)
     
-    # Output lists
+    # Output lists (pil_pages stays empty for SVG-only callers)
     pil_pages = []
     svg_pages = [] # List of SVG strings
+    page_count = 0
+    # Every page starts as a copy of one white template (a memcpy instead of a fresh fill)
+    blank_page = Image.new('RGB', page_size_px, 'white') if want_raster else None
+    svg_asset_cache = {}
     
     image_index = 0
     total_images = len(image_data)
@@ -462,16 +715,39 @@ def place_images_grid(image_data, page_size_px, grid_size, margin_px, spacing_px
     # Font for object numbering
     number_font = None
     if add_object_number:
-        try: number_font = get_font(object_number_font_size)
-        except: number_font = ImageFont.load_default()
+        number_font = get_font(object_number_font_size)
+
+    # Loop-invariant geometry (dividers, object numbers)
+    divider_margin = 20
+    divider_width = int(available_width * (divider_width_percent / 100))
+    div_start_x = margin_px + (available_width - divider_width) // 2
+    div_end_x = div_start_x + divider_width
+    font_h = object_number_font_size
+    padding_num = 5
+    # Extra space for object number if it's placed below
+    extra_number_space = 0
+    if add_object_number and object_number_position == 'bottom_center':
+        extra_number_space = object_number_font_size + 10  # font height + padding
+
+    # Row packing works on prefix sums of (width + spacing): the images
+    # [s, e) fit in one row when offsets[e] - offsets[s] - spacing <= available_width
+    sizes = [_item_size(d) for d in image_data]
+    heights = [h for _, h in sizes]
+    offsets = [0, *itertools.accumulate(w + spacing_px for w, _ in sizes)]
+    if want_raster: _set_paste_masks(image_data)
 
     while image_index < len(image_data):
-        # Initialize PIL Page
-        current_pil_page = Image.new('RGB', page_size_px, 'white')
-        # Initialize SVG Generator
-        current_svg_gen = SVGGenerator(page_width, page_height)
-        # Add white background rect for SVG
-        current_svg_gen.add_rect(0, 0, page_width, page_height, fill="white")
+        # Initialize PIL Page (skipped for SVG-only callers)
+        current_pil_page = None
+        if want_raster:
+            current_pil_page = blank_page.copy()
+            draw = ImageDraw.Draw(current_pil_page)
+        # Initialize SVG Generator (skipped for raster-only callers)
+        current_svg_gen = None
+        if want_svg:
+            current_svg_gen = SVGGenerator(page_width, page_height, asset_dir=svg_asset_dir, asset_cache=svg_asset_cache)
+            # Add white background rect for SVG
+            current_svg_gen.add_rect(0, 0, page_width, page_height, fill="white")
         
         page_has_images = False
         page_object_counter = 1 # Reset per page
@@ -489,7 +765,6 @@ def place_images_grid(image_data, page_size_px, grid_size, margin_px, spacing_px
         
         # Layout Calculation (Identify rows)
         while temp_image_index < len(image_data) and temp_rows_on_page < rows_per_page:
-            row_images, current_row_width, row_height = [], 0, 0
             temp_index = temp_image_index
             
             if page_break_on_primary_change and primary_sort_key and temp_rows_on_page > 0:
@@ -501,35 +776,32 @@ def place_images_grid(image_data, page_size_px, grid_size, margin_px, spacing_px
                             divider_rows.append((temp_rows_on_page, next_primary_value))
                             current_primary_value = next_primary_value
             
-            while temp_index < len(image_data) and len(row_images) < suggested_cols:
-                if page_break_on_primary_change and primary_sort_key and len(row_images) > 0:
-                    if temp_index < len(image_data):
-                        if primary_sort_key(image_data[temp_index]) != current_primary_value: break
-                
-                img = image_data[temp_index]['img']
-                needed_width = current_row_width + img.width + (spacing_px if row_images else 0)
-                if needed_width <= available_width:
-                    row_images.append(image_data[temp_index])
-                    current_row_width = needed_width
-                    row_height = max(row_height, img.height)
-                    temp_index += 1
-                else: break
+            # Furthest row end (at most suggested_cols images) that still fits the width
+            row_limit = min(temp_index + suggested_cols, len(image_data))
+            row_end = bisect.bisect_right(offsets, offsets[temp_index] + available_width + spacing_px,
+                                          temp_index + 1, row_limit + 1) - 1
             
-            if not row_images and temp_image_index < len(image_data):
-                row_images.append(image_data[temp_image_index])
-                row_height = image_data[temp_image_index]['img'].height
-                temp_index = temp_image_index + 1
+            # A change of primary value ends the row early
+            if page_break_on_primary_change and primary_sort_key:
+                for next_index in range(temp_index + 1, row_end):
+                    if primary_sort_key(image_data[next_index]) != current_primary_value:
+                        row_end = next_index
+                        break
             
-            if not row_images: break
-            page_rows.append((row_images, row_height))
+            # An image wider than the page still gets a row of its own
+            if row_end == temp_index:
+                row_end = temp_index + 1
+            
+            row_height = max(heights[temp_index:row_end])
+            page_rows.append((temp_index, row_end, row_height))
+            temp_index = row_end
             temp_image_index = temp_index
             temp_rows_on_page += 1
         
         if not page_rows: break
         
         # Calculate Vertical Spacing
-        divider_margin = 20
-        total_content_height = sum(r[1] for r in page_rows)
+        total_content_height = sum(r[2] for r in page_rows)
         total_spacing_height = spacing_px * (len(page_rows) - 1) if len(page_rows) > 1 else 0
         total_separator_height = len(divider_rows) * (divider_thickness + 2 * divider_margin)
         total_height_needed = total_content_height + total_spacing_height + total_separator_height
@@ -538,109 +810,104 @@ def place_images_grid(image_data, page_size_px, grid_size, margin_px, spacing_px
         if vertical_alignment == 'center' and total_height_needed < available_height:
             start_y = margin_px + (available_height - total_height_needed) // 2
         
-        # Rendering (Both PIL and SVG)
+        # Placement pass: positions only. Raster and SVG output are emitted from it afterwards,
+        # so raster-only callers never touch the SVG path.
         current_y = start_y
         images_placed_on_page = 0
         divider_dict = {row_idx: val for row_idx, val in divider_rows}
+        # One (divider y or None, placements) entry per row, in drawing order; a placement is
+        # (img_data, x, y, block width, block height, object number label or None)
+        placed_rows = []
         
-        for row_idx, (row_images, row_height) in enumerate(page_rows):
-            # Render Divider
+        for row_idx, (row_start, row_end, row_height) in enumerate(page_rows):
+            # Divider
+            divider_y = None
             if row_idx in divider_dict:
-                # PIL Drawing
-                pil_draw = ImageDraw.Draw(current_pil_page)
                 divider_y = current_y + divider_margin
-                divider_width = int(available_width * (divider_width_percent / 100))
-                div_start_x = margin_px + (available_width - divider_width) // 2
-                div_end_x = div_start_x + divider_width
-                pil_draw.line([(div_start_x, divider_y), (div_end_x, divider_y)], fill='black', width=divider_thickness)
-                
-                # SVG Drawing (Semantic Line)
-                current_svg_gen.add_line(div_start_x, divider_y, div_end_x, divider_y, stroke="black", stroke_width=divider_thickness)
-                
                 current_y += divider_thickness + 2 * divider_margin
 
-            if current_y + row_height > page_height - margin_px: break
+            if current_y + row_height > page_height - margin_px:
+                # The divider is still drawn when its row moves to the next page
+                if divider_y is not None: placed_rows.append((divider_y, []))
+                break
                 
-            # Render Row Images
-            total_row_img_width = sum(d['img'].width for d in row_images)
-            total_row_width_with_spacing = total_row_img_width + spacing_px * (len(row_images) - 1)
-            current_x = margin_px + (available_width - total_row_width_with_spacing) // 2
+            # Row Images: widths and x offsets straight from the prefix sums
+            total_row_width_with_spacing = offsets[row_end] - offsets[row_start] - spacing_px
+            row_x = margin_px + (available_width - total_row_width_with_spacing) // 2 - offsets[row_start]
             
-            for img_data in row_images:
-                img = img_data['img']
-                paste_y = current_y + (row_height - img.height) // 2
-                
-                # 1. PIL Paste
-                current_pil_page.paste(img, (current_x, paste_y), img if img.mode == 'RGBA' else None)
+            placements = []
+            for i in range(row_start, row_end):
+                paste_y = current_y + (row_height - heights[i]) // 2
                 
-                # 2. SVG Add (Semantic)
-                _render_item_to_svg(current_svg_gen, img_data, current_x, paste_y)
-                
-                # 3. Object Numbering
+                num_str = None
                 if add_object_number:
                     num_str = str(page_object_counter)
                     page_object_counter += 1
+                placements.append((image_data[i], row_x + offsets[i], paste_y, *sizes[i], num_str))
+            placed_rows.append((divider_y, placements))
+            
+            page_has_images = True
+            images_placed_on_page += row_end - row_start
+            current_y += row_height + spacing_px + extra_number_space
+            image_index += row_end - row_start
+        
+        # Raster pass
+        if current_pil_page:
+            for divider_y, placements in placed_rows:
+                if divider_y is not None:
+                    draw.line([(div_start_x, divider_y), (div_end_x, divider_y)], fill='black', width=divider_thickness)
+                
+                for img_data, x, y, w, h, num_str in placements:
+                    _paste_item(current_pil_page, img_data, x, y, img_data['paste_mask'])
                     
-                    draw = ImageDraw.Draw(current_pil_page)
-                    font_h = object_number_font_size
-                    padding_num = 5
-                    
+                    # Object Numbering
+                    if num_str is None: continue
                     if object_number_position == 'bottom_left':
                         # Overlay at bottom-left inside the image block
-                        nx = current_x + 5
-                        ny = paste_y + img.height - font_h - padding_num
-                        
-                        draw.text((nx, ny), num_str, font=number_font, fill="black")
-                        current_svg_gen.add_text(num_str, nx, ny + font_h, font_h, font_family="Arial", anchor="start")
-                        
+                        draw.text((x + 5, y + h - font_h - padding_num), num_str, font=number_font, fill="black")
                     elif object_number_position == 'bottom_center':
-                        # Place BELOW the image block (after it, not overlapping)
-                        nx = current_x + (img.width // 2)
-                        ny = paste_y + img.height + padding_num  # BELOW the image
-                        
-                        # PIL - center text
-                        bbox = draw.textbbox((0,0), num_str, font=number_font)
-                        tw = bbox[2] - bbox[0]
-                        draw.text((nx - tw/2, ny), num_str, font=number_font, fill="black")
-                        # SVG
-                        current_svg_gen.add_text(num_str, nx, ny + font_h, font_h, font_family="Arial", anchor="middle")
-
-                current_x += img.width + spacing_px
-                page_has_images = True
-                images_placed_on_page += 1
-            
-            # Add extra space for object number if it's placed below
-            extra_number_space = 0
-            if add_object_number and object_number_position == 'bottom_center':
-                extra_number_space = object_number_font_size + 10  # font height + padding
-            
-            current_y += row_height + spacing_px + extra_number_space
-            image_index += len(row_images)
+                        # Place BELOW the image block (after it, not overlapping), centered
+                        tw = _text_width(num_str, number_font)
+                        draw.text((x + (w // 2) - tw/2, y + h + padding_num), num_str, font=number_font, fill="black")
+        
+        # SVG pass (Semantic)
+        if current_svg_gen:
+            for divider_y, placements in placed_rows:
+                if divider_y is not None:
+                    current_svg_gen.add_line(div_start_x, divider_y, div_end_x, divider_y, stroke="black", stroke_width=divider_thickness)
+                
+                for img_data, x, y, w, h, num_str in placements:
+                    _render_item_to_svg(current_svg_gen, img_data, x, y)
+                    
+                    if num_str is None: continue
+                    if object_number_position == 'bottom_left':
+                        current_svg_gen.add_text(num_str, x + 5, y + h - padding_num, font_h, font_family="Arial", anchor="start")
+                    elif object_number_position == 'bottom_center':
+                        current_svg_gen.add_text(num_str, x + (w // 2), y + h + padding_num + font_h, font_h, font_family="Arial", anchor="middle")
         
         if page_has_images:
-            pil_pages.append(current_pil_page)
-            svg_pages.append(current_svg_gen.get_xml())
-            status_callback(f"Page {len(pil_pages)} created with {images_placed_on_page} images")
+            page_count += 1
+            if current_pil_page: pil_pages.append(current_pil_page)
+            if current_svg_gen: _finish_svg_page(current_svg_gen, svg_pages, svg_writer_factory)
+            status_callback(f"Page {page_count} created with {images_placed_on_page} images")
     
     # Handle Leftovers (Simplified logic for brevity, same parallel approach applies)
     if image_index < total_images:
-        remaining = image_data[image_index:]
-        for img_data in remaining:
-            # Create single page
-            p = Image.new('RGB', page_size_px, 'white')
-            s = SVGGenerator(page_width, page_height)
-            s.add_rect(0, 0, page_width, page_height, fill="white")
-            
-            img = img_data['img']
+        for img_data, (w, h) in zip(image_data[image_index:], sizes[image_index:]):
             # Scale logic (omitted for brevity, assume fits or scaled previously)
-            px = (page_width - img.width) // 2
-            py = (page_height - img.height) // 2
+            px = (page_width - w) // 2
+            py = (page_height - h) // 2
             
-            p.paste(img, (px, py))
-            _render_item_to_svg(s, img_data, px, py)
-            
-            pil_pages.append(p)
-            svg_pages.append(s.get_xml())
+            # Create single page
+            if want_raster:
+                p = blank_page.copy()
+                _paste_item(p, img_data, px, py)
+                pil_pages.append(p)
+            if want_svg:
+                s = SVGGenerator(page_width, page_height, asset_dir=svg_asset_dir, asset_cache=svg_asset_cache)
+                s.add_rect(0, 0, page_width, page_height, fill="white")
+                _render_item_to_svg(s, img_data, px, py)
+                _finish_svg_page(s, svg_pages, svg_writer_factory)
             status_callback(f"Created individual page for leftover: {img_data.get('name')}")
 
     return pil_pages, svg_pages
@@ -649,16 +916,19 @@ def place_images_grid(image_data, page_size_px, grid_size, margin_px, spacing_px
 def place_images_puzzle(image_data, page_size_px, margin_px, spacing_px, 
                         page_break_on_primary_change=False, primary_sort_key=None, 
                         add_object_number=False, object_number_position='bottom_center', 
-                        object_number_font_size=18, status_callback=print):
+                        object_number_font_size=18, want_raster=True, want_svg=True, svg_asset_dir=None,
+                        svg_writer_factory=None, status_callback=print):
     
-    # Wrapper to handle grouping, then delegates to internal
+    # Linked SVG images are shared by every group
+    svg_asset_cache = {}
+    
+    # Wrapper to handle grouping, then delegates to internal.
+    # Group by value rather than by consecutive run: the sort compares normalised keys
+    # (lower-cased, numeric), so raw primary values such as 'Roman'/'roman' can interleave.
     if page_break_on_primary_change and primary_sort_key:
-        from collections import OrderedDict
-        groups = OrderedDict()
+        groups = {} # insertion-ordered: groups keep their sorted order
         for d in image_data:
-            k = primary_sort_key(d)
-            if k not in groups: groups[k] = []
-            groups[k].append(d)
+            groups.setdefault(primary_sort_key(d), []).append(d)
         
         all_pil, all_svg = [], []
         for k, g_imgs in groups.items():
@@ -666,6 +936,11 @@ def place_images_puzzle(image_data, page_size_px, margin_px, spacing_px,
                                                add_object_number=add_object_number, 
                                                object_number_position=object_number_position,
                                                object_number_font_size=object_number_font_size,
+                                               want_raster=want_raster,
+                                               want_svg=want_svg,
+                                               svg_asset_dir=svg_asset_dir,
+                                               svg_asset_cache=svg_asset_cache,
+                                               svg_writer_factory=svg_writer_factory,
                                                status_callback=status_callback)
             all_pil.extend(p)
             all_svg.extend(s)
@@ -675,132 +950,148 @@ def place_images_puzzle(image_data, page_size_px, margin_px, spacing_px,
                                            add_object_number=add_object_number, 
                                            object_number_position=object_number_position,
                                            object_number_font_size=object_number_font_size,
+                                           want_raster=want_raster,
+                                           want_svg=want_svg,
+                                           svg_asset_dir=svg_asset_dir,
+                                           svg_asset_cache=svg_asset_cache,
+                                           svg_writer_factory=svg_writer_factory,
                                            status_callback=status_callback)
 
 
 def _place_images_puzzle_internal(image_data, page_size_px, margin_px, spacing_px, 
                                   add_object_number=False, object_number_position='bottom_center',
-                                  object_number_font_size=18, 
+                                  object_number_font_size=18, want_raster=True, want_svg=True,
+                                  svg_asset_dir=None, svg_asset_cache=None,
+                                  svg_writer_factory=None,
                                   status_callback=print):
     page_width, page_height = page_size_px
     bin_width = page_width - (2 * margin_px)
     bin_height = page_height - (2 * margin_px)
     
-    packer = rectpack.newPacker(rotation=False)
-    images = [d['img'] for d in image_data]
+    sizes = [_item_size(d) for d in image_data]
+    if want_raster: _set_paste_masks(image_data)
     
     # Calculate extra height needed for object numbers placed below
     extra_number_height = 0
     if add_object_number and object_number_position == 'bottom_center':
         extra_number_height = object_number_font_size + 10
+    font_h = object_number_font_size
+    padding_num = 5
     
-    # Map rectpack ID back to image_data index
-    for i, img in enumerate(images):
-        packer.add_rect(img.width + spacing_px, img.height + spacing_px + extra_number_height, rid=i)
+    # Prepare font (same for every page)
+    number_font = None
+    if add_object_number:
+        number_font = get_font(object_number_font_size)
     
-    # Add enough bins
-    for _ in range(len(images)):
-        packer.add_bin(bin_width, bin_height)
+    rect_sizes = [(w + spacing_px, h + spacing_px + extra_number_height) for w, h in sizes]
+    # Rects larger than a bin can never be packed; they go to individual pages below
+    packable = sum(1 for w, h in rect_sizes if w <= bin_width and h <= bin_height)
     
-    packer.pack()
+    # Start from an area estimate (+30% for packing waste) instead of one bin per image, and only
+    # grow when something packable was left out. Unused bins never reach the output, so the
+    # result is the same as with N bins.
+    bin_count = min(len(sizes), max(1, math.ceil(sum(w * h for w, h in rect_sizes) / (bin_width * bin_height) * 1.3)))
+    while True:
+        # MaxRects Best Area Fit packs mixed sherd sizes tighter than the default short-side fit;
+        # bin first fit stops at the first page with room instead of scoring every open page
+        packer = rectpack.newPacker(mode=rectpack.PackingMode.Offline, bin_algo=rectpack.PackingBin.BFF,
+                                    pack_algo=rectpack.MaxRectsBaf, rotation=False)
+        # Map rectpack ID back to image_data index
+        for i, (w, h) in enumerate(rect_sizes):
+            packer.add_rect(w, h, rid=i)
+        packer.add_bin(bin_width, bin_height, count=bin_count)
+        packer.pack()
+        
+        if len(packer.rect_list()) >= packable or bin_count >= len(sizes): break
+        bin_count = min(len(sizes), bin_count * 2)
     
     pil_pages = []
     svg_pages = []
     placed_indices = set()
+    blank_page = Image.new('RGB', page_size_px, 'white') if want_raster else None
+    if svg_asset_cache is None: svg_asset_cache = {}
     
-    for i, abin in enumerate(packer):
-        if not abin: break
-        
-        current_pil = Image.new('RGB', page_size_px, 'white')
-        current_svg = SVGGenerator(page_width, page_height)
-        current_svg.add_rect(0, 0, page_width, page_height, fill="white")
-        
-        # Prepare font
-        number_font = None
-        if add_object_number:
-            try: number_font = get_font(object_number_font_size)
-            except: number_font = ImageFont.load_default()
-            
-        # Collect all rects to sort them by position (reading order)
-        page_rects = []
-        for rect in abin:
-            page_rects.append(rect)
-            
-        # Sort: Top to Bottom (y), then Left to Right (x)
-        # We use a threshold for Y to group into "rows" roughly, otherwise exact Y sort might be erratic with varied heights.
-        # But for puzzle, exact Y sort is probably fine or simple Y-major sort.
-        page_rects.sort(key=lambda r: (r.y, r.x))
+    # Flat (bin, x, y, width, height, rid) tuples instead of per-bin Rectangle objects.
+    # Sort: page, then Top to Bottom (y), then Left to Right (x)
+    # We use a threshold for Y to group into "rows" roughly, otherwise exact Y sort might be erratic with varied heights.
+    # But for puzzle, exact Y sort is probably fine or simple Y-major sort.
+    placements = sorted(packer.rect_list(), key=lambda r: (r[0], r[2], r[1]))
+    
+    for i, page_rects in itertools.groupby(placements, key=lambda r: r[0]):
+        current_pil = None
+        if want_raster:
+            current_pil = blank_page.copy()
+            draw = ImageDraw.Draw(current_pil)
+        current_svg = None
+        if want_svg:
+            current_svg = SVGGenerator(page_width, page_height, asset_dir=svg_asset_dir, asset_cache=svg_asset_cache)
+            current_svg.add_rect(0, 0, page_width, page_height, fill="white")
         
         page_object_counter = 1
         count = 0
         
-        for rect in page_rects:
-            img_idx = rect.rid
+        for _, rect_x, rect_y, _, _, img_idx in page_rects:
             placed_indices.add(img_idx)
             data = image_data[img_idx]
-            img = data['img']
+            w, h = sizes[img_idx]
             
-            x = margin_px + rect.x
-            y = margin_px + rect.y
+            x = margin_px + rect_x
+            y = margin_px + rect_y
             
             # 1. PIL
-            current_pil.paste(img, (x, y), img if img.mode == 'RGBA' else None)
+            if current_pil: _paste_item(current_pil, data, x, y, data['paste_mask'])
             
             # 2. SVG
-            _render_item_to_svg(current_svg, data, x, y)
+            if current_svg: _render_item_to_svg(current_svg, data, x, y)
             
             # 3. Object Numbering
             if add_object_number:
                 num_str = str(page_object_counter)
                 page_object_counter += 1
                 
-                draw = ImageDraw.Draw(current_pil)
-                font_h = object_number_font_size
-                padding_num = 5
-                
                 if object_number_position == 'bottom_left':
                     nx = x + 5
-                    ny = y + img.height - font_h - padding_num
+                    ny = y + h - font_h - padding_num
                     
-                    draw.text((nx, ny), num_str, font=number_font, fill="black")
-                    current_svg.add_text(num_str, nx, ny + font_h, font_h, font_family="Arial", anchor="start")
+                    if current_pil: draw.text((nx, ny), num_str, font=number_font, fill="black")
+                    if current_svg: current_svg.add_text(num_str, nx, ny + font_h, font_h, font_family="Arial", anchor="start")
                     
                 elif object_number_position == 'bottom_center':
                     # Place BELOW the image block
-                    nx = x + (img.width // 2)
-                    ny = y + img.height + padding_num
+                    nx = x + (w // 2)
+                    ny = y + h + padding_num
                     
-                    bbox = draw.textbbox((0,0), num_str, font=number_font)
-                    tw = bbox[2] - bbox[0]
-                    draw.text((nx - tw/2, ny), num_str, font=number_font, fill="black")
-                    current_svg.add_text(num_str, nx, ny + font_h, font_h, font_family="Arial", anchor="middle")
+                    if current_pil:
+                        tw = _text_width(num_str, number_font)
+                        draw.text((nx - tw/2, ny), num_str, font=number_font, fill="black")
+                    if current_svg: current_svg.add_text(num_str, nx, ny + font_h, font_h, font_family="Arial", anchor="middle")
 
             count += 1
             
-        pil_pages.append(current_pil)
-        svg_pages.append(current_svg.get_xml())
+        if current_pil: pil_pages.append(current_pil)
+        if current_svg: _finish_svg_page(current_svg, svg_pages, svg_writer_factory)
         status_callback(f"Puzzle Page {i+1}: {count} images")
     
     # Handle unplaced (single pages)
     remaining_indices = set(range(len(image_data))) - placed_indices
     for idx in remaining_indices:
         d = image_data[idx]
-        img = d['img']
-        
-        p = Image.new('RGB', page_size_px, 'white')
-        s = SVGGenerator(page_width, page_height)
-        s.add_rect(0, 0, page_width, page_height, fill="white")
+        w, h = sizes[idx]
         
         # Simple center logic
         # (Scaling logic omitted for brevity, assume pre-scaled or fits)
-        x = (page_width - img.width) // 2
-        y = (page_height - img.height) // 2
+        x = (page_width - w) // 2
+        y = (page_height - h) // 2
         
-        p.paste(img, (x, y))
-        _render_item_to_svg(s, d, x, y)
-        
-        pil_pages.append(p)
-        svg_pages.append(s.get_xml())
+        if want_raster:
+            p = blank_page.copy()
+            _paste_item(p, d, x, y)
+            pil_pages.append(p)
+        if want_svg:
+            s = SVGGenerator(page_width, page_height, asset_dir=svg_asset_dir, asset_cache=svg_asset_cache)
+            s.add_rect(0, 0, page_width, page_height, fill="white")
+            _render_item_to_svg(s, d, x, y)
+            _finish_svg_page(s, svg_pages, svg_writer_factory)
         status_callback(f"Individual page for unplaced puzzle image: {d['name']}")
         
     return pil_pages, svg_pages
\ No newline at end of file
@@ -459,6 +459,7 @@ async function handleGenerate() {
         scale_bar_cm: parseInt(document.getElementById('scaleBarCm').value),
         pixels_per_cm: parseInt(document.getElementById('pixelsPerCm').value),
         export_format: document.getElementById('exportFormat').value,
+        svg_linked_images: document.getElementById('svgLinkedImages').checked,
         add_table_number: document.getElementById('addTableNumber').checked,
         table_start_number: parseInt(document.getElementById('tableStartNumber').value),
         table_position: document.getElementById('tablePosition').value,
@@ -0,0 +1,44 @@
+import os
+import sys
+
+import pytest
+
+Image = pytest.importorskip("PIL.Image")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import backend_logic
+
+
+@pytest.fixture
+def folder_with_truncated_jpeg(tmp_path):
+    """One good JPEG and one whose scan data is cut off after the header."""
+    Image.new('RGB', (200, 100), 'red').save(tmp_path / 'good.jpg', 'JPEG')
+    # Noise keeps the scan data large next to the header, so halving the file leaves the header readable
+    Image.effect_noise((400, 300), 64).convert('RGB').save(tmp_path / 'trunc.jpg', 'JPEG')
+    data = (tmp_path / 'trunc.jpg').read_bytes()
+    (tmp_path / 'trunc.jpg').write_bytes(data[:len(data) // 2])
+    return tmp_path
+
+
+@pytest.mark.parametrize('scale_factor', [1.0, 0.5])
+def test_scale_images_drops_truncated_file(folder_with_truncated_jpeg, scale_factor):
+    messages = []
+    image_data = backend_logic.load_images_with_info(str(folder_with_truncated_jpeg), status_callback=messages.append)
+    # Only the header is read at load time, so both files get past loading
+    assert [d['name'] for d in image_data] == ['good.jpg', 'trunc.jpg']
+
+    image_data = backend_logic.scale_images(image_data, scale_factor, status_callback=messages.append)
+
+    assert [d['name'] for d in image_data] == ['good.jpg']
+    assert "Warning: Could not load trunc.jpg." in messages
+    assert image_data[0]['img'].size == (int(200 * scale_factor), int(100 * scale_factor))
+
+
+def test_add_captions_drops_truncated_file(folder_with_truncated_jpeg):
+    messages = []
+    image_data = backend_logic.load_images_with_info(str(folder_with_truncated_jpeg), status_callback=messages.append)
+
+    image_data = backend_logic.add_captions_to_images(image_data, None, 12, 5, status_callback=messages.append)
+
+    assert [d['name'] for d in image_data] == ['good.jpg']
+    assert "Warning: Could not load trunc.jpg." in messages